@@ -19,21 +19,363 @@ Last Updated: Tues Mar 11 2025
 Version: 1.0
 """
 
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
 import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc  # For improved styling
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from flask_caching import Cache
 import plotly.graph_objects as go
-import yfinance as yf
-from styles import light_theme, dark_theme, get_global_styles  # Import styles
+from styles import (light_theme, dark_theme, GLOBAL_LIGHT, GLOBAL_DARK,  # Import styles
+                    panel_style, button_row_style)
+
+# yfinance, pandas, aiohttp and the Numba indicators are imported inside the functions
+# that use them: together they add about a second to every worker start and reload.
 
 # Initialize the Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+server = app.server  # WSGI entry point for Gunicorn
+
+# Cache yf.Ticker objects so repeated callbacks reuse their HTTP session and cookies
+_ticker_cache = {}
+_ticker_lock = threading.Lock()  # Dash may run callbacks on several threads
+
+def get_ticker(ticker):
+    import yfinance as yf
+
+    with _ticker_lock:
+        stock_data = _ticker_cache.get(ticker)
+        if stock_data is None:
+            stock_data = _ticker_cache[ticker] = yf.Ticker(ticker)
+        return stock_data
+
+# Short-lived cache of history() results keyed by (ticker, period, interval).
+# Defaults to an in-process cache; set REDIS_URL to share it across Gunicorn workers.
+cache = Cache(server, config={
+    "CACHE_TYPE": "RedisCache" if os.environ.get("REDIS_URL") else "SimpleCache",
+    "CACHE_REDIS_URL": os.environ.get("REDIS_URL"),
+    "CACHE_DEFAULT_TIMEOUT": 5
+})
+INTRADAY_TTL = 5  # seconds
+DAILY_TTL = 300  # seconds; daily bars change far less often
+
+def refresh_history(ticker, period, interval, timeout=None):
+    stock_price = get_ticker(ticker).history(period=period, interval=interval)
+    if timeout is None:
+        timeout = DAILY_TTL if interval == "1d" else INTRADAY_TTL
+    cache.set(f"history:{ticker}:{period}:{interval}", stock_price, timeout=timeout)
+    return stock_price
+
+def fetch_history(ticker, period, interval):
+    stock_price = cache.get(f"history:{ticker}:{period}:{interval}")
+    if stock_price is None:
+        stock_price = refresh_history(ticker, period, interval)
+    return stock_price
+
+# Today's bars for every series a browser is polling, refreshed by one background job
+# instead of by each browser's interval callback
+LIVE_REFRESH_SECONDS = 5
+LIVE_IDLE_SECONDS = 60  # Stop refreshing a series nobody has polled for this long
+_live_series = {}
+_live_lock = threading.Lock()
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    # Started on first use so importing the app (e.g. by Gunicorn's master) spawns no threads
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            _scheduler = BackgroundScheduler(daemon=True)
+            _scheduler.add_job(refresh_live_series, "interval", seconds=LIVE_REFRESH_SECONDS,
+                               max_instances=1, coalesce=True)
+            _scheduler.add_job(expire_price_stream, "interval", seconds=LIVE_REFRESH_SECONDS,
+                               max_instances=1, coalesce=True)
+            # Staggered so workers starting together don't all download the listing at once
+            _scheduler.add_job(refresh_ticker_list, "interval", hours=1,
+                               next_run_time=datetime.now() + timedelta(seconds=random.uniform(5, 60)))
+            _scheduler.start()
+        return _scheduler
+
+def refresh_live_series():
+    now = time.monotonic()
+    with _live_lock:
+        for idle in [key for key, last_polled in _live_series.items() if now - last_polled > LIVE_IDLE_SECONDS]:
+            del _live_series[idle]
+        active = list(_live_series)
+    for ticker, interval in active:
+        try:
+            # Outlive the refresh period so readers never fall through to Yahoo between runs
+            refresh_history(ticker, "1d", interval, timeout=3 * LIVE_REFRESH_SECONDS)
+        except Exception as e:
+            print(f"Error refreshing {ticker} ({interval}): {e}")
+
+def get_live_history(ticker, interval):
+    with _live_lock:
+        _live_series[(ticker, interval)] = time.monotonic()
+    get_scheduler()
+    return fetch_history(ticker, "1d", interval)  # Only hits Yahoo before the job's first run
+
+# Known exchange-listed symbols, so mistyped tickers are rejected without a request to
+# Yahoo. A background job loads every US listing from NASDAQ Trader, downloaded at most
+# weekly and shared between workers through a cache file.
+TICKER_CACHE_PATH = os.environ.get("TICKER_CACHE_PATH",
+                                   os.path.join(tempfile.gettempdir(), "trade-dashboard-tickers.csv"))
+TICKER_LIST_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt"
+TICKER_LIST_MAX_AGE = 7 * 24 * 3600  # seconds
+
+def load_ticker_list(path):
+    with open(path, newline="") as f:
+        return frozenset(row["symbol"] for row in csv.DictReader(f))
+
+_valid_tickers = None  # Until the listing loads, every symbol is left for Yahoo to judge
+
+# Symbols the exchange listing could contain (AAPL, GOOGL, BRK-B). Five-letter symbols ending
+# in F, X or Y are OTC foreign shares, mutual funds and OTC ADRs (NSRGY, VFIAX, TCEHY), which
+# aren't in it; neither are indices, futures, FX, crypto or foreign listings (SHOP.TO).
+US_LISTING_PATTERN = re.compile(r"[A-Z]{1,4}(-[A-Z])?|[A-Z]{4}[A-EG-WZ]")
+
+def refresh_ticker_list():
+    global _valid_tickers
+    import pandas as pd
+
+    try:
+        if time.time() - os.path.getmtime(TICKER_CACHE_PATH) < TICKER_LIST_MAX_AGE:
+            _valid_tickers = load_ticker_list(TICKER_CACHE_PATH)  # Another worker downloaded it recently
+            return
+    except FileNotFoundError:
+        pass
+    except (OSError, KeyError) as e:
+        print(f"Ticker cache unreadable, downloading: {e}")
+
+    try:
+        listings = pd.read_csv(TICKER_LIST_URL, sep="|", dtype=str).dropna(subset=["Symbol"])
+        listings = listings[(listings["Test Issue"] == "N") & ~listings["Symbol"].str.contains("$", regex=False)]
+        symbols = sorted(set(listings["Symbol"].str.replace(".", "-", regex=False)))  # Yahoo writes BRK.B as BRK-B
+        _valid_tickers = frozenset(symbols)
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(TICKER_CACHE_PATH), suffix=".csv")
+        with os.fdopen(fd, "w", newline="") as f:
+            pd.DataFrame({"symbol": symbols}).to_csv(f, index=False)
+        os.replace(tmp_path, TICKER_CACHE_PATH)
+    except Exception as e:
+        print(f"Error refreshing ticker list: {e}")
+
+def normalize_ticker(ticker):
+    # Yahoo symbols are uppercase; one spelling keeps cache keys and stream ids consistent
+    return (ticker or "").strip().upper()
+
+def is_known_ticker(ticker):
+    if not ticker:
+        return False
+    get_scheduler()  # Keeps the ticker list refresh running
+    if _valid_tickers is None or not US_LISTING_PATTERN.fullmatch(ticker):
+        return True
+    return ticker in _valid_tickers
+
+# Latest prices pushed by Yahoo's websocket, keyed by symbol, as (price, time received)
+STREAM_IDLE_SECONDS = 60  # Unsubscribe symbols nobody has read for this long
+PRICE_MAX_AGE = 60  # Older streamed prices (e.g. from before a reconnect) aren't served
+_latest_prices = {}
+_stream_symbols = {}  # Symbol -> time last read
+_stream = None
+_stream_thread = None
+_stream_lock = threading.Lock()
+
+def _on_price_message(message):
+    if "id" in message and "price" in message:
+        with _stream_lock:
+            if message["id"] in _stream_symbols:
+                _latest_prices[message["id"]] = (message["price"], time.monotonic())
+
+def _run_price_stream():
+    global _stream
+    import yfinance as yf
+
+    while True:
+        with _stream_lock:
+            stream = _stream = yf.WebSocket(verbose=False)
+            symbols = list(_stream_symbols)
+        try:
+            stream.subscribe(symbols)
+            stream.listen(_on_price_message)
+        except Exception as e:
+            print(f"Price stream disconnected: {e}")
+        finally:
+            stream.close()
+        time.sleep(5)  # Back off before reconnecting
+
+def expire_price_stream():
+    now = time.monotonic()
+    with _stream_lock:
+        idle = [symbol for symbol, last_read in _stream_symbols.items() if now - last_read > STREAM_IDLE_SECONDS]
+        for symbol in idle:
+            del _stream_symbols[symbol]
+            _latest_prices.pop(symbol, None)
+        stream = _stream
+    if idle and stream is not None:
+        try:
+            stream.unsubscribe(idle)
+        except Exception as e:
+            print(f"Error unsubscribing from {idle}: {e}")  # Dropped anyway on reconnect
+
+def stream_price(ticker):
+    # Subscribe on first request; returns None until Yahoo pushes a recent price
+    global _stream_thread
+    now = time.monotonic()
+    with _stream_lock:
+        if _stream_thread is None:
+            _stream_thread = threading.Thread(target=_run_price_stream, daemon=True)
+            _stream_thread.start()
+        stream = None
+        if ticker not in _stream_symbols:
+            stream = _stream  # None until the stream thread connects; it subscribes the full set itself
+        _stream_symbols[ticker] = now
+        price, received = _latest_prices.get(ticker, (None, None))
+    get_scheduler()  # Keeps idle symbols expiring
+    if stream is not None:
+        try:
+            stream.subscribe(ticker)
+        except Exception as e:
+            print(f"Error subscribing to {ticker}: {e}")  # Picked up again on reconnect
+    if price is None or now - received > PRICE_MAX_AGE:
+        return None
+    return price
+
+def get_latest_price(ticker):
+    # Returns None when there's neither a streamed price nor intraday bars (e.g. mutual funds)
+    price = stream_price(ticker)
+    if price is None:
+        # Nothing streamed yet (e.g. market closed); fall back to the latest 1-minute bar
+        recent = get_live_history(ticker, "1m")
+        if not recent.empty:
+            price = recent["Close"].iloc[-1]
+    return price
+
+# Cap on candles sent to the browser; longer series are merged into coarser bars
+MAX_BARS = 2000
+
+def downsample_ohlc(stock_price, max_bars=MAX_BARS):
+    if len(stock_price) <= max_bars:
+        return stock_price
+    step = -(-len(stock_price) // max_bars)  # Ceiling division
+    # Group consecutive rows (not calendar buckets) so market closures don't leave gaps
+    groups = np.arange(len(stock_price)) // step
+    aggregations = {"Open": "first", "High": "max", "Low": "min", "Close": "last"}
+    if "EMA" in stock_price:
+        aggregations["EMA"] = "last"
+    resampled = stock_price.groupby(groups).agg(aggregations)
+    resampled.index = stock_price.index[::step]
+    return resampled
+
+# Yahoo's float32-derived prices carry long float noise (e.g. 187.13999938964844).
+# Rounding to float32 precision strips it without losing sub-cent prices (e.g. 1.24e-05).
+def round_prices(values):
+    return [float(f"{value:.7g}") for value in values]
+
+def epoch_ms(index):
+    # Wall-clock time as epoch milliseconds, which Plotly reads on a date axis
+    import pandas as pd
+
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return ((index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).tolist()
+
+def ohlc_columns(stock_price):
+    # Plain lists rather than numpy arrays, which serialize to binary blobs that Patch can't index into.
+    # Epoch-ms timestamps and rounded prices roughly halve the JSON size.
+    return {
+        "x": epoch_ms(stock_price.index),
+        "open": round_prices(stock_price["Open"]),
+        "high": round_prices(stock_price["High"]),
+        "low": round_prices(stock_price["Low"]),
+        "close": round_prices(stock_price["Close"])
+    }
+
+# Returned on error paths instead of allocating a new go.Figure (and its default template) each time
+EMPTY_FIG = {"data": [], "layout": {}}
+
+# Span of the exponential moving average overlaid on the chart
+EMA_SPAN = 20
 
 # Define available periods and intervals
 period_options = ["1d", "5d", "1mo", "3mo", "1y"]
 interval_options = ["1m", "5m", "15m", "1h", "1d"]
 
+# Commodity symbols for the macro panel, fetched together in one batched request
+commodity_symbols = {"GC=F": "Gold", "CL=F": "Oil", "BTC-USD": "Bitcoin"}
+
+# Macro indicators are independent requests, so they are fetched concurrently
+FRED_CSV_URL = "https://fred.stlouisfed.org/graph/fredgraph.csv?id={}&cosd={}"
+FRED_HISTORY_DAYS = 460  # Enough for 13 monthly CPI prints despite the release lag
+macro_labels = ["📉 10-Year Treasury Yield", "💹 Inflation (CPI)", "🛢️ Gold, Oil, Bitcoin"]
+# Results are shared by every browser through the flask_caching cache; FRED updates daily at most
+MACRO_TTLS = {"treasury-yield": 3600, "inflation": 3600, "commodities": 60}  # seconds
+
+async def fetch_fred_series(session, series_id):
+    import pandas as pd
+
+    start = (datetime.now() - timedelta(days=FRED_HISTORY_DAYS)).strftime("%Y-%m-%d")
+    async with session.get(FRED_CSV_URL.format(series_id, start)) as response:
+        response.raise_for_status()
+        text = await response.text()
+    series = pd.read_csv(io.StringIO(text), index_col=0).iloc[:, 0]
+    return pd.to_numeric(series, errors="coerce").dropna()  # Missing days are "."
+
+async def fetch_yield(session):
+    yields = await fetch_fred_series(session, "DGS10")
+    return f"{yields.iloc[-1]:.2f}%"
+
+async def fetch_cpi(session):
+    cpi = await fetch_fred_series(session, "CPIAUCSL")
+    return f"{(cpi.iloc[-1] / cpi.iloc[-13] - 1) * 100:.1f}% YoY"  # Monthly series
+
+def fetch_commodities():
+    import yfinance as yf
+
+    # One request for all symbols instead of one Ticker per symbol
+    prices = yf.download(" ".join(commodity_symbols), period="1d", interval="5m",
+                         group_by="ticker", threads=True, progress=False)
+    quotes = []
+    for symbol, name in commodity_symbols.items():
+        closes = prices[symbol]["Close"].dropna()
+        quotes.append(f"{name}: ${closes.iloc[-1]:,.2f}" if not closes.empty else f"{name}: N/A")
+    return " | ".join(quotes)
+
+async def fetch_macro_indicators():
+    import aiohttp
+
+    results = {key: cache.get(f"macro:{key}") for key in MACRO_TTLS}
+    missing = [key for key, result in results.items() if result is None]
+    if missing:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            fetchers = {
+                "treasury-yield": lambda: fetch_yield(session),
+                "inflation": lambda: fetch_cpi(session),
+                # yfinance is synchronous; run_in_executor rather than to_thread keeps Python 3.7 support
+                "commodities": lambda: asyncio.get_running_loop().run_in_executor(None, fetch_commodities)
+            }
+            fetched = await asyncio.gather(*(fetchers[key]() for key in missing), return_exceptions=True)
+        for key, result in zip(missing, fetched):
+            if not isinstance(result, Exception):  # Errors are retried on the next refresh
+                cache.set(f"macro:{key}", result, timeout=MACRO_TTLS[key])
+            results[key] = result
+    return list(results.values())
+
 # Define Layout
 app.layout = html.Div([
     html.H1("Real-Time Financial Dashboard", style={"textAlign": "center", "marginBottom": "20px"}),
@@ -51,22 +393,25 @@ app.layout = html.Div([
             dcc.Input(id="stock-input", type="text", value="AAPL", debounce=True, 
                       style={"marginBottom": "10px", "width": "100%"}),
             html.Div(id="live-price", children="💲 Current Price: (Loading...)"),
+            dcc.Interval(id="interval-component", interval=5 * 1000, n_intervals=0),  # Refresh price every 5 seconds
             dcc.Graph(id="stock-chart", figure={}),
+            dcc.Store(id="chart-meta"),  # Ticker, interval and last bar of the plotted series
+            dcc.Store(id="chart-selection", data={"period": period_options[0], "interval": interval_options[0]}),
             
             # Period Selection Buttons
             html.Div([
                 html.H5("Select Time Period:"),
                 *[dbc.Button(period, id={"type": "period-button", "index": period}, 
                              color="primary", outline=True, className="me-1") for period in period_options]
-            ], style={"marginTop": "10px", "textAlign": "center"}),
+            ], style=button_row_style),
 
             # Interval Selection Buttons
             html.Div([
                 html.H5("Select Candlestick Interval:"),
                 *[dbc.Button(interval, id={"type": "interval-button", "index": interval}, 
                              color="secondary", outline=True, className="me-1") for interval in interval_options]
-            ], style={"marginTop": "10px", "textAlign": "center"}),
-        ], style={"width": "50%", "display": "inline-block", "padding": "20px", "verticalAlign": "top"}),
+            ], style=button_row_style),
+        ], style=panel_style),
 
         # Macro Indicators & News
         html.Div([
@@ -76,49 +421,94 @@ app.layout = html.Div([
                 html.Div("💹 Inflation (CPI): (Loading...)", id="inflation"),
                 html.Div("🛢️ Gold, Oil, Bitcoin: (Loading...)", id="commodities"),
             ]),
+            dcc.Interval(id="macro-interval", interval=60 * 1000, n_intervals=0),  # Refresh every minute
             html.H2("📰 Financial News"),
             html.Div(id="news-feed", children="Latest headlines will go here..."),
-        ], style={"width": "50%", "display": "inline-block", "padding": "20px", "verticalAlign": "top"}),
+        ], style=panel_style),
     ], style={"display": "flex", "justifyContent": "space-between"}),  
 ], id="page-content")  # ✅ Ensures dark mode applies globally
 
+# Callback to record the most recently clicked period or interval
+@app.callback(
+    Output("chart-selection", "data"),
+    [Input({"type": "period-button", "index": dash.ALL}, "n_clicks"),
+     Input({"type": "interval-button", "index": dash.ALL}, "n_clicks")],
+    State("chart-selection", "data"),
+    prevent_initial_call=True
+)
+def update_chart_selection(period_clicks, interval_clicks, selection):
+    button = dash.ctx.triggered_id
+    if not isinstance(button, dict):
+        return dash.no_update
+    key = "period" if button["type"] == "period-button" else "interval"
+    return {**selection, key: button["index"]}
+
 # Callback to update stock price & chart
 @app.callback(
-    [Output("live-price", "children"), Output("stock-chart", "figure")],
-    [Input("stock-input", "value"), Input("theme-switch", "value"),
-     Input({"type": "period-button", "index": dash.ALL}, "n_clicks"),
-     Input({"type": "interval-button", "index": dash.ALL}, "n_clicks")]
+    [Output("live-price", "children"), Output("stock-chart", "figure"), Output("chart-meta", "data")],
+    [Input("stock-input", "value"), Input("chart-selection", "data")],
+    State("theme-switch", "value")
 )
-def update_stock_price(ticker, is_dark_mode, period_clicks, interval_clicks):
-    selected_theme = "dark" if is_dark_mode else "light"
-    period = period_options[next((i for i, v in enumerate(period_clicks) if v), 0)]  # Default to first option if no click
-    interval = interval_options[next((i for i, v in enumerate(interval_clicks) if v), 0)]  # Default to first option if no click
+def update_stock_price(ticker, selection, is_dark_mode):
+    from indicators import ema
+
+    ticker = normalize_ticker(ticker)
+    period, interval = selection["period"], selection["interval"]
+    if not is_known_ticker(ticker):
+        return f"Invalid Ticker: {ticker}", EMPTY_FIG, None
     print(f"Fetching stock data for: {ticker} with period={period} and interval={interval}")  # Debugging print
 
     try:
-        stock_data = yf.Ticker(ticker)
-        latest_price = stock_data.fast_info["lastPrice"]
+        stock_price = fetch_history(ticker, period, interval)
+
+        if stock_price.empty:
+            return f"Invalid Ticker: {ticker}", EMPTY_FIG, None
+
+        # A failed price lookup shouldn't cost the user a chart that has data
+        try:
+            latest_price = get_latest_price(ticker)
+        except Exception as e:
+            print(f"Error fetching live price for {ticker}: {e}")
+            latest_price = None
+        if latest_price is None:
+            latest_price = stock_price["Close"].iloc[-1]
         price_text = f"Current Price: ${latest_price:.2f}"
 
-        stock_price = stock_data.history(period=period, interval=interval)
+        # Compute indicators on the full series, before any bars are merged
+        ema_values = ema(stock_price["Close"].to_numpy(dtype="float64", copy=True), EMA_SPAN, np.nan)
+        stock_price = stock_price.assign(EMA=ema_values)
 
-        if stock_price.empty:
-            return f"Invalid Ticker: {ticker}", go.Figure()
+        downsampled = downsample_ohlc(stock_price)
+        meta = {
+            "ticker": ticker,
+            "interval": interval,
+            "last_ts": stock_price.index[-1].isoformat(),
+            "n_bars": len(downsampled),
+            "downsampled": len(downsampled) < len(stock_price),  # Merged bars can't take live updates
+            "ema_prev": float(ema_values[-2]) if len(ema_values) > 1 else None,  # Seeds live EMA updates
+            "ema_last": float(ema_values[-1])
+        }
+        stock_price = downsampled
 
         # Select theme colors
-        theme = dark_theme if selected_theme == "dark" else light_theme
+        theme = dark_theme if is_dark_mode else light_theme
 
         # Create the candlestick chart
         fig = go.Figure()
+        columns = ohlc_columns(stock_price)
         fig.add_trace(go.Candlestick(
-            x=stock_price.index,
-            open=stock_price["Open"],
-            high=stock_price["High"],
-            low=stock_price["Low"],
-            close=stock_price["Close"],
-            increasing_line_color="lime" if selected_theme == "dark" else "green",
+            **columns,
+            name=ticker,
+            increasing_line_color=theme["increasing"],
             decreasing_line_color="red"
         ))
+        fig.add_trace(go.Scattergl(  # WebGL keeps overlays cheap at high bar counts
+            x=columns["x"],
+            y=round_prices(stock_price["EMA"]),
+            mode="lines",
+            name=f"EMA {EMA_SPAN}",
+            line=dict(color="orange", width=1.5)
+        ))
 
         fig.update_layout(
             title=f"{ticker} Stock Price",
@@ -127,33 +517,134 @@ def update_stock_price(ticker, is_dark_mode, period_clicks, interval_clicks):
             plot_bgcolor=theme["graph_bg"],
             paper_bgcolor=theme["graph_bg"],
             font=dict(color=theme["graph_text"]),
-            xaxis=dict(gridcolor="gray"),
-            yaxis=dict(gridcolor="gray")
+            xaxis=dict(type="date", gridcolor="gray", rangeslider=dict(visible=False)),  # Rangeslider redraws every candle
+            yaxis=dict(gridcolor="gray"),
+            dragmode="pan"
         )
 
-        return price_text, fig
+        return price_text, fig, meta
 
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
-        return f"Error: {str(e)}", go.Figure()
+        return f"Error: {str(e)}", EMPTY_FIG, None
 
-# Callback to update page theme
+# Callback to refresh the live price and patch the newest candles into the chart
 @app.callback(
-    Output("page-content", "style"),
-    Input("theme-switch", "value")
+    [Output("live-price", "children", allow_duplicate=True),
+     Output("stock-chart", "figure", allow_duplicate=True),
+     Output("chart-meta", "data", allow_duplicate=True)],
+    Input("interval-component", "n_intervals"),
+    [State("stock-input", "value"), State("chart-meta", "data")],
+    prevent_initial_call=True
 )
-def update_theme(is_dark_mode):
+def update_live_data(n_intervals, ticker, meta):
+    import pandas as pd
+    from indicators import ema
+
+    ticker = normalize_ticker(ticker)
+    if not is_known_ticker(ticker):
+        return dash.no_update, dash.no_update, dash.no_update
+
+    try:
+        latest_price = get_latest_price(ticker)
+    except Exception as e:
+        print(f"Error fetching live price for {ticker}: {e}")
+        latest_price = None
+    # Otherwise keep the price from the last full update
+    price_text = dash.no_update if latest_price is None else f"Current Price: ${latest_price:.2f}"
+
+    if not meta or meta["downsampled"] or meta["ticker"] != ticker:
+        return price_text, dash.no_update, dash.no_update
+
+    try:
+        recent = get_live_history(ticker, meta["interval"])
+    except Exception as e:
+        print(f"Error fetching latest bars for {ticker}: {e}")
+        return price_text, dash.no_update, dash.no_update
+
+    last_ts = pd.Timestamp(meta["last_ts"])
+    recent = recent[recent.index >= last_ts]
+    if recent.empty:
+        return price_text, dash.no_update, dash.no_update
+
+    # Send only the changed candles instead of the whole figure
+    patched = dash.Patch()
+    trace = patched["data"][0]
+    columns = ohlc_columns(recent)
+    start = 0
+    if recent.index[0] == last_ts:
+        # The last plotted candle may still have been forming; overwrite it in place
+        for key in ("open", "high", "low", "close"):
+            trace[key][meta["n_bars"] - 1] = columns[key][0]
+        start = 1
+    for key, values in columns.items():
+        trace[key].extend(values[start:])
+
+    # Continue the EMA from the stored values rather than recomputing the whole series
+    seed = meta["ema_prev"] if start else meta["ema_last"]
+    ema_values = ema(np.array(columns["close"], dtype="float64"), EMA_SPAN,
+                     np.nan if seed is None else float(seed))
+    ema_trace = patched["data"][1]
+    if start:
+        ema_trace["y"][meta["n_bars"] - 1] = round_prices(ema_values[:1])[0]
+    ema_trace["x"].extend(columns["x"][start:])
+    ema_trace["y"].extend(round_prices(ema_values[start:]))
+
+    meta = {
+        **meta,
+        "last_ts": recent.index[-1].isoformat(),
+        "n_bars": meta["n_bars"] + len(recent) - start,
+        "ema_prev": float(ema_values[-2]) if len(ema_values) > 1 else seed,
+        "ema_last": float(ema_values[-1])
+    }
+    return price_text, patched, meta
+
+# Callback to update macroeconomic indicators
+@app.callback(
+    [Output("treasury-yield", "children"), Output("inflation", "children"), Output("commodities", "children")],
+    Input("macro-interval", "n_intervals")
+)
+def update_macro_indicators(n_intervals):
+    results = asyncio.run(fetch_macro_indicators())
+    indicators = []
+    for label, result in zip(macro_labels, results):
+        if isinstance(result, Exception):
+            print(f"Error fetching {label}: {result}")
+            indicators.append(f"{label}: Error: {str(result)}")
+        else:
+            indicators.append(f"{label}: {result}")
+    return indicators
+
+# Callback to restyle the existing chart without refetching stock data
+@app.callback(
+    Output("stock-chart", "figure", allow_duplicate=True),
+    [Input("theme-switch", "value"),
+     # Also re-applied after each render, so a figure built before a toggle can't keep the old theme.
+     # chart-meta is set only while a candlestick trace is plotted.
+     Input("chart-meta", "data")],
+    prevent_initial_call=True
+)
+def update_chart_theme(is_dark_mode, meta):
     theme = dark_theme if is_dark_mode else light_theme
-    return {
-        "backgroundColor": theme["background"],  
-        "color": theme["text"],  
-        "height": "100vh",  
-        "width": "100vw",
-        "fontFamily": "Arial, sans-serif",  
-        "padding": "20px",
-        "transition": "background-color 0.5s ease"
+    patched = dash.Patch()
+    patched["layout"]["plot_bgcolor"] = theme["graph_bg"]
+    patched["layout"]["paper_bgcolor"] = theme["graph_bg"]
+    patched["layout"]["font"]["color"] = theme["graph_text"]
+    if meta:
+        patched["data"][0]["increasing"]["line"]["color"] = theme["increasing"]
+    return patched
+
+# Clientside callback to update page theme (no round-trip to the server)
+app.clientside_callback(
+    """
+    function(isDarkMode) {
+        return isDarkMode ? %s : %s;
     }
+    """ % (json.dumps(GLOBAL_DARK), json.dumps(GLOBAL_LIGHT)),
+    Output("page-content", "style"),
+    Input("theme-switch", "value")
+)
 
-# Run the app
+# Run the app (development server only; see README for Gunicorn)
 if __name__ == "__main__":
-    app.run_server(debug=True)
+    app.run(debug=True)
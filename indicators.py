@@ -0,0 +1,23 @@
+# indicators.py
+
+import numpy as np
+from numba import njit
+
+# Technical indicators over candle series, JIT-compiled with Numba
+
+@njit(cache=True)
+def ema(values, span, seed):
+    # Exponential moving average; seed continues a previously computed series (NaN starts fresh).
+    # Callers pass a writable float64 array, an int span and a float seed, so the single
+    # specialization compiled below is the only one ever used.
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(values)
+    prev = seed
+    for i in range(len(values)):
+        if not np.isnan(values[i]):  # Missing bars carry the previous value forward
+            prev = values[i] if np.isnan(prev) else alpha * values[i] + (1 - alpha) * prev
+        out[i] = prev
+    return out
+
+# Compile once at import so the first callback doesn't pay for it
+ema(np.zeros(2), 2, np.nan)
@@ -5,6 +5,7 @@ light_theme = {
     "text": "#000000",
     "graph_bg": "#F5F5F5",
     "graph_text": "#000000",
+    "increasing": "green",  # Candlestick up-bar color
     "font": "Arial, sans-serif"
 }
 
@@ -13,12 +14,12 @@ dark_theme = {
     "text": "#E0E0E0",
     "graph_bg": "#3A3A3A",
     "graph_text": "#FFFFFF",
+    "increasing": "lime",  # Candlestick up-bar color
     "font": "Arial, sans-serif"
 }
 
-# Function to return global styles based on the selected theme
-def get_global_styles(selected_theme):
-    theme = dark_theme if selected_theme == "dark" else light_theme
+# Global page styles, built once at import rather than on every theme toggle
+def _global_styles(theme):
     return {
         "backgroundColor": theme["background"],
         "color": theme["text"],
@@ -28,3 +29,10 @@ def get_global_styles(selected_theme):
         "padding": "20px",
         "transition": "background-color 0.5s ease"
     }
+
+GLOBAL_LIGHT = _global_styles(light_theme)
+GLOBAL_DARK = _global_styles(dark_theme)
+
+# Static layout styles
+panel_style = {"width": "50%", "display": "inline-block", "padding": "20px", "verticalAlign": "top"}
+button_row_style = {"marginTop": "10px", "textAlign": "center"}